@@ -60,6 +60,22 @@ function setProgress(box, progress) {
     };
 };
 
+function show_votes(validators, encoded_bits) {
+    // Base64 bitfield with one bit per validator, least significant bit first
+    let bits = atob(encoded_bits);
+    validators.childNodes.forEach((val, i) => {
+        if ((bits.charCodeAt(i >> 3) >> (i & 7)) & 1) {
+            val.classList.add('voted');
+        }
+        else {
+            val.classList.remove('voted');
+        };
+    });
+};
+
+// Latest state, kept to redraw the votes when the validator list is rebuilt
+let state = {};
+
 wso.onopen = function (evt) {
     connection_status.style.display = "none";
 }
@@ -68,10 +84,21 @@ wso.onclose = function (evt) {
     connection_status.style.display = "block";
 };
 
-wso.onmessage = async function (event) {
-    let data = JSON.parse(await event.data);
+wso.onmessage = function (event) {
+    let data = JSON.parse(event.data);
+    if (data.hasOwnProperty('round_step')) {
+        state = data;
+    };
     if (data.hasOwnProperty('monikers')) {
         populate_validators(data['monikers']);
+        // The rebuilt validators have no votes shown, and the next state
+        // is only sent once the votes or the round change
+        if (state.hasOwnProperty('pv_bits') && state['pv_bits'].length > 0) {
+            show_votes(prevotes_validators, state['pv_bits']);
+        };
+        if (state.hasOwnProperty('pc_bits') && state['pc_bits'].length > 0) {
+            show_votes(precommits_validators, state['pc_bits']);
+        };
     };
     if (data.hasOwnProperty('version')) {
         let version = data['version'];
@@ -86,32 +113,16 @@ wso.onmessage = async function (event) {
         prevotes_ratio_div.textContent = pv_percentage + '%';
         setProgress(pv_bar_box, pv_percentage);
     };
-    if (data.hasOwnProperty('pv_list') && data['pv_list'].length > 0) {
-        let prevote_list = data['pv_list'];
-        prevotes_validators.childNodes.forEach(val => {
-            val.classList.remove('voted');
-        });
-        for (let i = 0; i < prevote_list.length; ++i) {
-            if (prevote_list[i] == 1) {
-                prevotes_validators.childNodes[i].classList.add('voted');
-            }
-        };
+    if (data.hasOwnProperty('pv_bits') && data['pv_bits'].length > 0) {
+        show_votes(prevotes_validators, data['pv_bits']);
     };
     if (data.hasOwnProperty('pc_percentage')) {
         let pc_percentage = parseInt(data['pc_percentage']);
         precommits_ratio_div.textContent = pc_percentage + '%';
         setProgress(pc_bar_box, pc_percentage);
     };
-    if (data.hasOwnProperty('pc_list') && data['pc_list'].length > 0) {
-        let precommit_list = data['pc_list'];
-        precommits_validators.childNodes.forEach(val => {
-            val.classList.remove('voted');
-        });
-        for (let i = 0; i < precommit_list.length; ++i) {
-            if (precommit_list[i]) {
-                precommits_validators.childNodes[i].classList.add('voted');
-            }
-        };
+    if (data.hasOwnProperty('pc_bits') && data['pc_bits'].length > 0) {
+        show_votes(precommits_validators, data['pc_bits']);
     };
 };
 
@@ -6,6 +6,8 @@ A websockets server that provides real-time data on the consensus process of a C
 -  2. subscriptions are created for Vote, NewRoundStep, and ValidatorSetUpdates events
 - As soon as an event is received, the consensus state is queried
   to obtain the prevotes and precommits as a percentage of the total voting power.
+- The monitor runs in its own process and relays each update over a socket pair
+  to the main process, which fans it out to the websockets clients.
 
 Syntax:
 ./consensus_monitor_server.py -a <API server> -r <RPC server> -p <ws listening port>
@@ -13,14 +15,97 @@ Example:
 ./consensus_monitor_server.py -a api.cosmos.network -r rpc.cosmos.network -p 9090
 
 """
-import urllib.parse
-import json
+import base64
+import tempfile
+import os
+import stat
+import pathlib
+import time
+import re
+import functools
+import hashlib
 import argparse
 import logging
-import sys
 import asyncio
-import requests
+import multiprocessing
+import socket
+import aiohttp
+import msgspec
+import orjson
 import websockets
+from websockets.frames import Frame, Opcode
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(message)s'
+# Attempts per API/RPC query, and the delay in seconds before the first retry
+QUERY_ATTEMPTS = 3
+QUERY_RETRY_DELAY = 0.5
+
+
+class AsyncLimiter:
+    """
+    Limits the number of coroutines inside 'async with limiter' to 'limit'.
+    Unlike asyncio.Semaphore, the limit can be changed safely with resize().
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        """
+        Wait until fewer than 'limit' coroutines are active
+        """
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self):
+        """
+        Let the next waiting coroutine in
+        """
+        async with self.condition:
+            self.active -= 1
+            self.condition.notify(1)
+
+    async def resize(self, limit: int):
+        """
+        Change the limit, waking waiters if it was raised
+        """
+        async with self.condition:
+            self.limit = limit
+            self.condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info):
+        await self.release()
+
+
+def rpc_guard(query):
+    """
+    Decorator for API/RPC query coroutines:
+    network errors are retried up to QUERY_ATTEMPTS times with exponential backoff,
+    then logged like unexpected responses and None is returned
+    """
+    @functools.wraps(query)
+    async def guarded_query(*query_args, **query_kwargs):
+        for attempt in range(QUERY_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(QUERY_RETRY_DELAY * 2 ** (attempt - 1))
+            try:
+                return await query(*query_args, **query_kwargs)
+            except (ConnectionError, aiohttp.ClientError, asyncio.TimeoutError) as err:
+                logging.exception(
+                    f'{query.__name__}> {type(err).__name__}: {err}', exc_info=False)
+            except (orjson.JSONDecodeError, msgspec.MsgspecError,
+                    IndexError, KeyError, TypeError) as err:
+                logging.exception(
+                    f'{query.__name__}> {type(err).__name__}: {err}', exc_info=False)
+                break
+        return None
+    return guarded_query
 
 
 async def gather_limit(max_coros, *awaits, return_exceptions=False):
@@ -30,15 +115,108 @@ async def gather_limit(max_coros, *awaits, return_exceptions=False):
     Source: https://stackoverflow.com/a/61478547
     """
 
-    semaphore = asyncio.Semaphore(max_coros)
+    limiter = AsyncLimiter(max_coros)
 
-    async def sem_aw(coro):
-        async with semaphore:
+    async def limited_aw(coro):
+        async with limiter:
             return await coro
-    return await asyncio.gather(*(sem_aw(aw) for aw in awaits), return_exceptions=return_exceptions)
+    return await asyncio.gather(*(limited_aw(aw) for aw in awaits),
+                                return_exceptions=return_exceptions)
 
 
-class ConsensusMonitor:
+class ClientSender:
+    """
+    Sends messages to a single websockets client from its own task.
+    While the client is busy, only the latest message of each kind is kept,
+    so a slow client receives the newest state instead of a backlog
+    and never holds up the other clients.
+    """
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.pending = {}
+        self.ready = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    def queue(self, message, kind: str):
+        """
+        Queue the message, replacing any unsent message of the same kind
+        """
+        self.pending.pop(kind, None)
+        self.pending[kind] = message
+        self.ready.set()
+
+    async def run(self):
+        """
+        Send queued messages in order until the connection closes
+        """
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.pending:
+                    message = self.pending.pop(next(iter(self.pending)))
+                    # orjson output is UTF-8, send it as a text frame
+                    await self.websocket.send(message.decode())
+        except websockets.exceptions.ConnectionClosedError as cce:
+            logging.exception(
+                f'sender> ConnectionClosedError: {cce}', exc_info=False)
+        except websockets.exceptions.ConnectionClosedOK as cco:
+            logging.exception(
+                f'sender> ConnectionClosedOK: {cco}', exc_info=False)
+        except ConnectionResetError as cre:
+            logging.exception(
+                f'sender> ConnectionResetError: {cre}', exc_info=False)
+        except asyncio.exceptions.IncompleteReadError as ire:
+            logging.exception(
+                f'sender> IncompleteReadError: {ire}', exc_info=False)
+
+    def idle(self):
+        """
+        True if nothing is queued or waiting in the connection's write buffer,
+        so a message written directly to the connection goes out in order
+        """
+        return not self.pending and self.websocket.transport.get_write_buffer_size() == 0
+
+    def close(self):
+        """
+        Stop the sender task
+        """
+        self.task.cancel()
+
+
+class HeightVoteSet(msgspec.Struct):  # pylint: disable=too-few-public-methods
+    """
+    The prevotes and precommits of one round in /consensus_state
+    """
+    prevotes: list[str]
+    prevotes_bit_array: str
+    precommits: list[str]
+    precommits_bit_array: str
+
+
+class RoundState(msgspec.Struct):  # pylint: disable=too-few-public-methods
+    """
+    The round state in /consensus_state, only the vote sets are decoded
+    """
+    height_vote_set: list[HeightVoteSet]
+
+
+class ConsensusStateResult(msgspec.Struct):  # pylint: disable=too-few-public-methods
+    """
+    The result of a /consensus_state query
+    """
+    round_state: RoundState
+
+
+class ConsensusStateResponse(msgspec.Struct):  # pylint: disable=too-few-public-methods
+    """
+    The /consensus_state response, fields not declared above are skipped while decoding
+    """
+    result: ConsensusStateResult
+
+
+class ConsensusMonitor:  # pylint: disable=too-many-instance-attributes
     """
     Requests and parses consensus data from a Cosmos node.
     Packages the data and forwards it to all connected websockets clients.
@@ -56,10 +234,43 @@ class ConsensusMonitor:
         '{ "jsonrpc": "2.0", "method": "subscribe", \
             "params": ["tm.event=\'ValidatorSetUpdates\'"], "id": 3 }'
     ]
-    # The maximum number of websocket .send coroutines running at once
-    # Larger number means more concurrent bandwidth usage,
-    # also probably a bit more CPU usage?
-    MAX_CONCURRENT_SEND_COROS = 100
+    # Patterns used to discard Vote events before decoding them,
+    # the node may send compact or indented JSON
+    VOTE_EVENT_MARKER = "tm.event='Vote'"
+    VOTE_TYPE_PATTERN = re.compile(r'"type":\s*(\d+)')
+    VOTE_ADDRESS_PATTERN = re.compile(r'"validator_address":\s*"([0-9A-Fa-f]{12})')
+    # The vote type counted in each voting round step
+    VOTE_TYPES = {'RoundStepPrevote': 1,
+                  'RoundStepPrecommit': 2}
+    # Round state fields and the state keys they populate
+    VOTE_SETS = (
+        ('prevotes', 'prevotes_bit_array', 'pv_bits', 'pv_percentage'),
+        ('precommits', 'precommits_bit_array', 'pc_bits', 'pc_percentage'))
+    CONSENSUS_STATE_DECODER = msgspec.json.Decoder(ConsensusStateResponse)
+    # Voting power tally in a bit array, e.g. BA{150:xx_x...} 7070/8080 = 0.88
+    BIT_ARRAY_TALLY = re.compile(r'(\d+)/(\d+) =')
+    # The maximum number of paginated API/RPC queries running at once
+    MAX_CONCURRENT_PAGE_QUERIES = 8
+    # The maximum number of API/RPC queries in flight to the node at once
+    MAX_CONCURRENT_QUERIES = 8
+    # Vote events arriving within this many seconds share one state update
+    VOTE_FLUSH_INTERVAL = 0.1
+    # The node version is queried again after this many blocks
+    VERSION_REFRESH_BLOCKS = 100
+    # Bounds in seconds for the backoff between failed validator queries
+    RETRY_DELAY = 10
+    RETRY_DELAY_MAX = 60
+    # Staking validators requested per page, the API default is 100
+    STAKING_PAGE_LIMIT = 1000
+    # Active validators requested per page, the RPC maximum (default 30)
+    ACTIVE_PAGE_LIMIT = 100
+    # Staking validator pages fetched at startup are cached on disk for this many seconds
+    STAKING_CACHE_TTL = 300
+    STAKING_CACHE_DIR = pathlib.Path(
+        os.environ.get('XDG_CACHE_HOME') or pathlib.Path.home() / '.cache') / 'consensus-monitor'
+    # Bounds in seconds for the RPC websocket reconnection backoff
+    RECONNECT_DELAY_MIN = 0.5
+    RECONNECT_DELAY_MAX = 30
 
     def __init__(self,
                  api_server: str,
@@ -67,232 +278,309 @@ class ConsensusMonitor:
         self.node = {'api': api_server,
                      'rpc': rpc_server}
         self.node_online = False
-        self.state = {'prevote_addresses': [],
-                      'precommit_addresses': [],
-                      'round_step': 'RoundStepPropose'}
+        self.state = {'round_step': 'RoundStepPropose'}
         self.old_state = {}
         self.addr_moniker_dict = {}
-        self.client_websockets = []
-
-        self.generate_addr_moniker_dict()
-
-    def get_staking_validators(self, next_key: str = None):
+        self.monikers = ()
+        self._no_votes = ''
+        self._pubkey_moniker_dict = {}
+        self._staking_fingerprint = None
+        self._use_staking_cache = True
+        self._addr_to_idx = {}
+        self._votes_pending = asyncio.Event()
+        self._state_lock = asyncio.Lock()
+        self._cached_version = None
+        self._version_last_height = -1
+        self._last_state = b''
+        self._channel = None
+        self._outbox = {}
+        self._http = None
+        self._query_limiter = AsyncLimiter(self.MAX_CONCURRENT_QUERIES)
+
+    @rpc_guard
+    async def get_staking_validators(self, next_key: str = None, offset: int = None):
         """
         Obtain the list of validators through the API server
+        The first page (no key or offset) also reports the total validator count
+        """
+        url = self.node['api'] + self.API_ENDPOINT_VALIDATORS
+        params = {'pagination.limit': self.STAKING_PAGE_LIMIT}
+        if next_key:
+            params['pagination.key'] = next_key
+        elif offset:
+            params['pagination.offset'] = offset
+        else:
+            params['pagination.count_total'] = 'true'
+        if self._use_staking_cache:
+            page = self.read_staking_cache(url, params)
+            if page:
+                return page
+        async with self._query_limiter, self._http.get(url, params=params) as response:
+            validators = orjson.loads(await response.read())
+        # Raise KeyError here rather than in the caller if the page is malformed
+        page = {'validators': validators['validators'],
+                'pagination': validators['pagination']}
+        if self._use_staking_cache:
+            self.write_staking_cache(url, params, page)
+        return page
+
+    def staking_cache_path(self, url: str, params: dict):
+        """
+        Return the cache file for a staking validators page URL and query parameters,
+        or None if the cache directory is not private to the current user
         """
         try:
-            if next_key:
-                validators = (requests.get(self.node['api'] + self.API_ENDPOINT_VALIDATORS +
-                                           '?pagination.key=' +
-                                           urllib.parse.quote(next_key))).json()
-            else:
-                validators = (requests.get(self.node['api'] +
-                              self.API_ENDPOINT_VALIDATORS)).json()
-            return validators
-        except ConnectionResetError as cres:
-            logging.exception(
-                f'get_staking_validators> ConnectionResetError: {cres}', exc_info=False)
-        except ConnectionRefusedError as cref:
-            logging.exception(
-                f'get_staking_validators> ConnectionRefusedError: {cref}', exc_info=False)
-        except ConnectionError as cerr:
-            logging.exception(
-                f'get_staking_validators> ConnectionError: {cerr}', exc_info=False)
-        except requests.exceptions.ConnectionError as cerr:
-            logging.exception(
-                f'get_staking_validators> Requests ConnectionError: {cerr}', exc_info=False)
-        sys.exit(0)
-
-    def get_active_validators(self, page: int = 1):
+            self.STAKING_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # Refuse a directory (or symlink) planted or opened up by another user
+            dir_stat = self.STAKING_CACHE_DIR.lstat()
+        except OSError as err:
+            logging.exception(f'staking cache> {err}', exc_info=False)
+            return None
+        if not stat.S_ISDIR(dir_stat.st_mode) or dir_stat.st_uid != os.getuid() or \
+                dir_stat.st_mode & 0o077:
+            logging.warning(f'staking cache> {self.STAKING_CACHE_DIR} is not private, '
+                            'the cache is disabled')
+            return None
+        name = hashlib.blake2b(orjson.dumps([url, params]), digest_size=16).hexdigest()
+        return self.STAKING_CACHE_DIR / f'{name}.json'
+
+    def read_staking_cache(self, url: str, params: dict):
         """
-        Obtain the active validator set through the RPC server
+        Return the cached staking validators page for the URL and query parameters,
+        or None if it is missing, unreadable or older than STAKING_CACHE_TTL
         """
+        path = self.staking_cache_path(url, params)
+        if path is None:
+            return None
         try:
-            validators = (requests.get(
-                self.node['rpc'] + self.RPC_ENDPOINT_VALIDATORS+f'?page={page}')).json()['result']
-            return validators
-        except ConnectionResetError as cres:
-            logging.exception(
-                f'get_active_validators> ConnectionResetError: {cres}', exc_info=False)
-        except ConnectionRefusedError as cref:
-            logging.exception(
-                f'get_active_validators> ConnectionRefusedError: {cref}', exc_info=False)
-        except ConnectionError as cerr:
-            logging.exception(
-                f'get_active_validators> ConnectionError: {cerr}', exc_info=False)
-        except requests.exceptions.ConnectionError as cerr:
-            logging.exception(
-                f'get_active_validators> Requests ConnectionError: {cerr}', exc_info=False)
-        sys.exit(0)
+            if time.time() - path.stat().st_mtime > self.STAKING_CACHE_TTL:
+                return None
+            return orjson.loads(path.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return None
 
-    def get_version(self):
+    def write_staking_cache(self, url: str, params: dict, page: dict):
         """
-        Obtain the current version through the RPC server
+        Store a staking validators page for other monitors starting against the same node
         """
+        path = self.staking_cache_path(url, params)
+        if path is None:
+            return
         try:
-            version = (requests.get(self.node['rpc'] + self.RPC_ENDPOINT_ABCI_INFO)
-                       ).json()['result']['response']['version']
-            return version
-        except ConnectionResetError as cres:
-            logging.exception(
-                f'get_version> ConnectionResetError: {cres}', exc_info=False)
-        except ConnectionRefusedError as cref:
-            logging.exception(
-                f'get_version> ConnectionRefusedError: {cref}', exc_info=False)
-        except ConnectionError as cerr:
-            logging.exception(
-                f'get_version> ConnectionError: {cerr}', exc_info=False)
-        except requests.exceptions.ConnectionError as cerr:
-            logging.exception(
-                f'get_version> Requests ConnectionError: {cerr}', exc_info=False)
-        except KeyError as kerr:
-            logging.exception(
-                f'get_version> Key Error: {kerr}', exc_info=False)
-        except TypeError as terr:
-            logging.exception(
-                f'get_version> Type Error: {terr}', exc_info=False)
-        return None
+            # Write then rename so a concurrent reader never sees a partial file
+            partial_fd, partial = tempfile.mkstemp(suffix='.tmp', dir=self.STAKING_CACHE_DIR)
+            with os.fdopen(partial_fd, 'wb') as partial_file:
+                partial_file.write(orjson.dumps(page))
+            os.replace(partial, path)
+        except OSError as err:
+            logging.exception(f'staking cache> {err}', exc_info=False)
+
+    @rpc_guard
+    async def get_active_validators(self, page: int = 1):
+        """
+        Obtain the active validator set through the RPC server
+        """
+        async with self._query_limiter, self._http.get(
+                self.node['rpc'] + self.RPC_ENDPOINT_VALIDATORS,
+                params={'page': page, 'per_page': self.ACTIVE_PAGE_LIMIT}) as response:
+            validators = orjson.loads(await response.read())['result']
+        return validators
+
+    @rpc_guard
+    async def get_version(self):
+        """
+        Obtain the current version through the RPC server
+        """
+        async with self._query_limiter, \
+                self._http.get(self.node['rpc'] + self.RPC_ENDPOINT_ABCI_INFO) as response:
+            version = orjson.loads(await response.read())['result']['response']['version']
+        return version
 
-    def get_round_state(self):
+    @rpc_guard
+    async def get_round_state(self):
         """
         Obtain the current round state through the RPC server
         """
-        try:
-            round_state = (requests.get(self.node['rpc'] + self.RPC_ENDPOINT_CONSENSUS)
-                           ).json()['result']['round_state']['height_vote_set'][0]
-            return round_state
-        except ConnectionResetError as cres:
-            logging.exception(
-                f'get_round_state> ConnectionResetError: {cres}', exc_info=False)
-        except ConnectionRefusedError as cref:
-            logging.exception(
-                f'get_round_state> ConnectionRefusedError: {cref}', exc_info=False)
-        except ConnectionError as cerr:
-            logging.exception(
-                f'get_round_state> ConnectionError: {cerr}', exc_info=False)
-        except requests.exceptions.ConnectionError as cerr:
-            logging.exception(
-                f'get_round_state> Requests ConnectionError: {cerr}', exc_info=False)
-        except KeyError as kerr:
-            logging.exception(
-                f'get_round_state> Key Error: {kerr}', exc_info=False)
-        except TypeError as terr:
-            logging.exception(
-                f'get_round_state> Type Error: {terr}', exc_info=False)
-        return None
+        async with self._query_limiter, \
+                self._http.get(self.node['rpc'] + self.RPC_ENDPOINT_CONSENSUS) as response:
+            round_state = self.CONSENSUS_STATE_DECODER.decode(
+                await response.read()).result.round_state.height_vote_set[0]
+        return round_state
 
-    def generate_addr_moniker_dict(self):
+    async def initial_load(self):
         """
-        Populate the address-moniker dictionary:
-        {consensus_address: moniker, ...}
+        Open the HTTP session and build the address-moniker dictionary,
+        retrying until the API and RPC servers respond
+        """
+        # Keep-alive connections and cached DNS lookups are reused by every query
+        self._http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=16, limit_per_host=self.MAX_CONCURRENT_QUERIES,
+                                           keepalive_timeout=75, ttl_dns_cache=300))
+        delay = self.RETRY_DELAY
+        while not await self.generate_addr_moniker_dict():
+            logging.info(
+                f'Could not collect validators, retrying in {delay}s')
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.RETRY_DELAY_MAX)
+        # Validator set updates must see the current staking validators
+        self._use_staking_cache = False
+
+    async def flush_votes(self):
+        """
+        Update the state at most once per interval while Vote events are pending
+        """
+        while True:
+            await self._votes_pending.wait()
+            self._votes_pending.clear()
+            await self.update_state()
+            await asyncio.sleep(self.VOTE_FLUSH_INTERVAL)
+
+    async def close(self):
+        """
+        Close the HTTP session
+        """
+        if self._http:
+            await self._http.close()
+
+    async def update_pubkey_moniker_dict(self, force: bool = False):
+        """
+        Populate the pubkey-moniker dictionary from the staking validators:
+        {consensus_pubkey: moniker, ...}
+        The remaining pages are only fetched if the validator count or the
+        first page changed since the last update, or if 'force' is set.
+        Returns False and keeps the current dictionary if a query fails
         """
         # Get list of validators and their consensus pubkeys
         logging.info("Collecting consensus addresses...")
-        validators = self.get_staking_validators()
+        validators = await self.get_staking_validators()
+        if validators is None:
+            return False
         staking_vals = validators['validators']
-        next_key = (validators['pagination']['next_key'])
-        while next_key:
-            validators = self.get_staking_validators(next_key)
-            staking_vals.extend(validators['validators'])
-            next_key = validators['pagination']['next_key']
+        next_key = validators['pagination']['next_key']
+        staking_total = int(validators['pagination'].get('total') or 0)
+        fingerprint = (staking_total, hashlib.blake2b(
+            ''.join(val['consensus_pubkey']['key'] for val in staking_vals).encode()).digest())
+        if fingerprint == self._staking_fingerprint and not force:
+            logging.info('Staking validators are unchanged.')
+            return True
+        page_size = len(staking_vals)
+        if next_key and staking_total > page_size > 0:
+            # Fetch the remaining pages concurrently by offset
+            pages = await gather_limit(
+                self.MAX_CONCURRENT_PAGE_QUERIES,
+                *[self.get_staking_validators(offset=offset)
+                  for offset in range(page_size, staking_total, page_size)])
+            if None in pages:
+                return False
+            for validators in pages:
+                staking_vals.extend(validators['validators'])
+        else:
+            # The API did not report a total, follow the page keys instead
+            while next_key:
+                validators = await self.get_staking_validators(next_key)
+                if validators is None:
+                    return False
+                staking_vals.extend(validators['validators'])
+                next_key = validators['pagination']['next_key']
         logging.info(f'{len(staking_vals)} validators found.')
-        pubkey_moniker_dict = {val['consensus_pubkey']['key']:
-                               val['description']['moniker'] for val in staking_vals}
+        self._pubkey_moniker_dict = {val['consensus_pubkey']['key']:
+                                     val['description']['moniker'] for val in staking_vals}
+        self._staking_fingerprint = fingerprint
+        return True
+
+    async def generate_addr_moniker_dict(self):
+        """
+        Populate the address-moniker dictionary:
+        {consensus_address: moniker, ...}
+        Returns False and keeps the current dictionary if a query fails
+        """
+        if not await self.update_pubkey_moniker_dict():
+            return False
 
         # Get active validator set
         logging.info('Collecting active validators...')
-        validators = self.get_active_validators()
+        validators = await self.get_active_validators()
+        if validators is None:
+            return False
         validator_set = validators['validators']
         validators_total = int(validators['total'])
-        validators_read = int(validators['count'])
-        if validators_read < validators_total:
-            page = 2
-            while validators_read < validators_total:
-                validators = self.get_active_validators(page)
+        validators_per_page = int(validators['count'])
+        if 0 < validators_per_page < validators_total:
+            page_count = -(-validators_total // validators_per_page)
+            pages = await gather_limit(
+                self.MAX_CONCURRENT_PAGE_QUERIES,
+                *[self.get_active_validators(page) for page in range(2, page_count + 1)])
+            if None in pages:
+                return False
+            for validators in pages:
                 validator_set.extend(validators['validators'])
-                validators_read += int(validators['count'])
-                page += 1
 
         logging.info(
             f'Found {len(validator_set)} addresses in the active validator set.')
-        address_pubkey_dict = {
-            val['address']: val['pub_key']['value'] for val in validator_set}
-
-        # Clip the consensus address to match the vote tally reporting length
+        # A new validator can join without changing the first staking page
+        if any(val['pub_key']['value'] not in self._pubkey_moniker_dict for val in validator_set):
+            self._use_staking_cache = False
+            if not await self.update_pubkey_moniker_dict(force=True):
+                return False
+
+        # Clip the consensus address to match the vote tally reporting length,
+        # validators without a staking record are left out
         self.addr_moniker_dict = {
-            addr[:12]: pubkey_moniker_dict[pubkey] for addr, pubkey in address_pubkey_dict.items()}
-
-    async def update_prevotes(self, round_state: dict):
-        """
-        Update the state dictionary with:
-        - pv_list: list of validators that have voted
-        - pv_voting_power: voting power that has voted so far/total voting power
-        - pv_percentage: pv_voting_power in decimal format
-        """
-        prevotes = round_state['prevotes']
-        pv_bit_array = round_state['prevotes_bit_array']
-        ratio = pv_bit_array.split()[1]
-        pv_votes_in = int(ratio.split("/")[0])
-        total_voting_power = int(ratio.split("/")[1])
-        pv_percentage = 100*(pv_votes_in/total_voting_power)
-        self.state['pv_list'] = [0 for i in range(len(self.addr_moniker_dict))]
-        self.state['pv_percentage'] = '0.00%'
-        self.state['prevote_addresses'] = []
-
-        # if pv_validators_voted > 0:
-        if pv_votes_in > 0:
-            prevotes_list = []
-            for prevote in prevotes:
-                if prevote != 'nil-Vote':
-                    # consensus address is clipped to 12 characters
-                    addr = prevote.split(':')[1].split(' ')[0]
-                    self.state['prevote_addresses'].append(addr)
-                    try:
-                        moniker = self.addr_moniker_dict[addr]
-                        if moniker not in prevotes_list:
-                            prevotes_list.append(moniker)
-                    except KeyError as kerr:
-                        logging.exception(
-                            f'PV> Validator address not found: {kerr}', exc_info=False)
-            self.state['pv_list'] = [1 if val in prevotes_list
-                                     else 0 for val in self.addr_moniker_dict.values()]
-            self.state['pv_percentage'] = f'{pv_percentage:.2f}%'
-
-    async def update_precommits(self, round_state: dict):
-        """
-        Update the state dictionary with:
-        - pc_list: list of validators that have voted
-        - pc_voting_power: voting power that has voted so far/total voting power
-        - pc_percentage: pv_voting_power in decimal format
-        """
-        # Precommits
-        precommits = round_state['precommits']
-        pc_bit_array = round_state['precommits_bit_array']
-        ratio = pc_bit_array.split()[1]
-        pc_votes_in = int(ratio.split("/")[0])
-        total_voting_power = int(ratio.split("/")[1])
-        pc_percentage = 100*(pc_votes_in/total_voting_power)
-        self.state['pc_list'] = [0 for i in range(len(self.addr_moniker_dict))]
-        self.state['pc_percentage'] = '0.00%'
-        self.state['prevote_addresses'] = []
-
-        if pc_votes_in > 0:
-            precommits_list = []
-            for precommit in precommits:
-                if precommit != 'nil-Vote':
-                    # consensus address is clipped to 12 characters
-                    addr = precommit.split(':')[1].split(' ')[0]
-                    self.state['prevote_addresses'].append(addr)
-                    try:
-                        moniker = self.addr_moniker_dict[addr]
-                        if moniker not in precommits_list:
-                            precommits_list.append(moniker)
-                    except KeyError as kerr:
-                        logging.exception(
-                            f'PC> Validator address not found: {kerr}', exc_info=False)
-            self.state['pc_list'] = [1 if val in precommits_list
-                                     else 0 for val in self.addr_moniker_dict.values()]
-            self.state['pc_percentage'] = f'{pc_percentage:.2f}%'
+            val['address'][:12]: moniker for val in validator_set
+            if (moniker := self._pubkey_moniker_dict.get(val['pub_key']['value'])) is not None}
+        if len(self.addr_moniker_dict) < len(validator_set):
+            logging.warning(
+                f'{len(validator_set) - len(self.addr_moniker_dict)} active validators '
+                'have no staking record.')
+        # Monikers in the order sent to clients, and the position of each clipped address
+        self.monikers = tuple(self.addr_moniker_dict.values())
+        self._no_votes = base64.b64encode(bytes((len(self.monikers) + 7) // 8)).decode()
+        self._addr_to_idx = {addr: i for i,
+                             addr in enumerate(self.addr_moniker_dict)}
+        return True
+
+    def _apply_round_state(self, round_state: HeightVoteSet):
+        """
+        Update the state dictionary from the prevotes and precommits in one pass:
+        - pv_bits/pc_bits: base64 bitfield with one bit per validator in moniker order,
+          least significant bit first, set if the validator has voted
+        - pv_percentage/pc_percentage: voting power that has voted so far
+          as a percentage of the total voting power
+        The voter addresses are not included: clients only need the bitfields
+        """
+        for votes_key, bit_array_key, bits_key, percentage_key in self.VOTE_SETS:
+            votes_in, total_voting_power = map(
+                int, self.BIT_ARRAY_TALLY.search(getattr(round_state, bit_array_key)).groups())
+            self.state[percentage_key] = f'{100*(votes_in/total_voting_power):.2f}%'
+            if votes_in == 0:
+                # Nobody has voted yet, as at the start of every round
+                self.state[bits_key] = self._no_votes
+                continue
+            voted = self._tally_votes(votes_key, getattr(round_state, votes_key))
+            # Little-endian bytes put validator i in bit i % 8 of byte i // 8
+            self.state[bits_key] = base64.b64encode(
+                voted.to_bytes((len(self.monikers) + 7) // 8, 'little')).decode()
+
+    def _tally_votes(self, votes_key: str, votes: list):
+        """
+        Return a bitmask with bit i set if validator i voted
+        Unknown addresses are counted and logged once
+        """
+        voted = 0
+        missing = 0
+        for vote in votes:
+            if vote != 'nil-Vote':
+                # consensus address is clipped to 12 characters:
+                # Vote{<index>:<address> <height>/<round>/...}
+                start = vote.find(':') + 1
+                idx = self._addr_to_idx.get(vote[start:start+12])
+                if idx is None:
+                    missing += 1
+                else:
+                    voted |= 1 << idx
+        if missing:
+            logging.debug(f'{votes_key}> {missing} validator address(es) not found')
+        return voted
 
     async def update_state(self):
         """
@@ -302,49 +590,63 @@ class ConsensusMonitor:
         - precommit validators and % of voting power
         - current round step
         """
-        round_state = self.get_round_state()
-        if round_state:
-            await self.update_prevotes(round_state)
-            await self.update_precommits(round_state)
-            if not self.node_online:
-                logging.info('Node is online')
-                self.node_online = True
-        else:
-            self.state['msg'] = 'Could not obtain round state'
-            if self.node_online:
-                logging.info('Node is offline')
-                self.node_online = False
-        await self.broadcast(json.dumps(self.state))
-
-    async def add_client(self, websocket):
+        # Vote flushes and events can request updates concurrently: fetch and apply
+        # one at a time so an older round state never overwrites a newer one
+        async with self._state_lock:
+            round_state = await self.get_round_state()
+            if round_state:
+                self._apply_round_state(round_state)
+                if not self.node_online:
+                    logging.info('Node is online')
+                    self.node_online = True
+            else:
+                self.state['msg'] = 'Could not obtain round state'
+                if self.node_online:
+                    logging.info('Node is offline')
+                    self.node_online = False
+
+            # Vote events often leave the tally unchanged, skip those broadcasts
+            state = orjson.dumps(self.state)
+            if state == self._last_state:
+                return
+            self._last_state = state
+            self.publish(state, 'state')
+
+    async def cached_version(self, height: int):
         """
-        Register websocket client, send current state
+        Return the node version, querying it only every VERSION_REFRESH_BLOCKS
+        or after the RPC websocket has reconnected
         """
-        self.client_websockets.append(websocket)
-        moniker_packet = {'monikers': list(self.addr_moniker_dict.values())}
-        addr_packet = {'data_sources': self.node}
-        try:
-            await websocket.send(json.dumps(addr_packet))
-            await websocket.send(json.dumps(moniker_packet))
-            await websocket.send(json.dumps(self.state))
-        except websockets.exceptions.ConnectionClosedError as cce:
-            logging.exception(
-                f'add_client> ConnectionClosedError: {cce}', exc_info=False)
-        except websockets.exceptions.ConnectionClosedOK as cco:
-            logging.exception(
-                f'add_client> ConnectionClosedOK: {cco}', exc_info=False)
-        except ConnectionResetError as cre:
-            logging.exception(
-                f'add_client> ConnectionResetError: {cre}', exc_info=False)
-        except asyncio.exceptions.IncompleteReadError as ire:
-            logging.exception(
-                f'add_client> IncompleteReadError: {ire}', exc_info=False)
-
-    async def remove_client(self, websocket):
+        if self._cached_version is None or \
+                height - self._version_last_height >= self.VERSION_REFRESH_BLOCKS:
+            version = await self.get_version()
+            if version is not None:
+                self._cached_version = version
+                self._version_last_height = height
+        return self._cached_version
+
+    def skip_vote_event(self, raw: str):
         """
-        Unregister websocket client
+        Return True if the raw event is a Vote that process_query_response
+        would ignore: the round is not in a voting step, the vote type does not
+        match the step, or the validator is not in the active set.
+        Fields that cannot be found leave the event to be decoded
         """
-        self.client_websockets.remove(websocket)
+        if self.VOTE_EVENT_MARKER not in raw:
+            return False
+        vote_type = self.VOTE_TYPES.get(self.state['round_step'])
+        if vote_type is None:
+            return True
+        # The event type is a string, so the first numeric "type" is the vote's
+        match = self.VOTE_TYPE_PATTERN.search(raw)
+        if match is None:
+            return False
+        if int(match[1]) != vote_type:
+            return True
+        match = self.VOTE_ADDRESS_PATTERN.search(raw)
+        if match is None:
+            return False
+        return match[1] not in self._addr_to_idx
 
     async def process_query_response(self, data):
         """
@@ -357,63 +659,113 @@ class ConsensusMonitor:
             if self.state['round_step'] == 'RoundStepPrevote':
                 if (value['Vote']['type'] == 1) and \
                         (value['Vote']['validator_address'][:12] in self.addr_moniker_dict):
-                    await self.update_state()
+                    self._votes_pending.set()
             elif self.state['round_step'] == 'RoundStepPrecommit':
                 if (value['Vote']['type'] == 2) and \
                         (value['Vote']['validator_address'][:12] in self.addr_moniker_dict):
-                    await self.update_state()
+                    self._votes_pending.set()
         elif new_event == 'NewRoundStep':
             self.state['round_step'] = value['step']
-            await self.update_state()
             if self.state['round_step'] == 'RoundStepNewHeight':
-                msg = json.dumps({'height': value['height']})
-                await self.broadcast(msg)
-                msg = json.dumps({'version': self.get_version()})
-                await self.broadcast(msg)
+                msg = orjson.dumps({'height': value['height']})
+                self.publish(msg, 'height')
+                # The round state and version queries do not depend on each other
+                _, version = await asyncio.gather(
+                    self.update_state(), self.cached_version(int(value['height'])))
+                self.publish(orjson.dumps({'version': version}), 'version')
+            else:
+                await self.update_state()
         elif new_event == 'ValidatorSetUpdates':
             logging.info('Validator set has been updated')
-            self.generate_addr_moniker_dict()
-            moniker_packet = {'monikers': list(
-                self.addr_moniker_dict.values())}
-            await self.broadcast(json.dumps(moniker_packet))
+            if await self.generate_addr_moniker_dict():
+                self.publish(orjson.dumps({'monikers': self.monikers}), 'monikers')
             await self.update_state()
 
     async def subscribe(self):
         """
         Subscribes to Tendermint RPC websocket endpoints
+        Reconnects with exponential backoff and subscribes again if the connection drops
         """
         ws_url = self.node['rpc'].replace('http', 'ws')
         ws_url = ws_url.replace('https', 'wss')
         ws_url = ws_url + '/websocket'
-        async for websocket in websockets.connect(ws_url):
+        delay = self.RECONNECT_DELAY_MIN
+        while True:
             try:
-                for sub in self.WS_EVENT_SUBSCRIPTIONS:
-                    await websocket.send(sub)
-                    await websocket.recv()
-                while True:
-                    data = json.loads(await websocket.recv())['result']
-                    if 'query' in data:
-                        await self.process_query_response(data)
-            except websockets.exceptions.ConnectionClosedError as cce:
-                print("subscription> Connection Closed Error: ", cce)
-
-    async def broadcast(self, message):
+                async with websockets.connect(ws_url,
+                                              ping_interval=20,
+                                              ping_timeout=20,
+                                              close_timeout=5,
+                                              max_queue=2**10) as websocket:
+                    # Subscription ids only need to be unique per connection
+                    for sub in self.WS_EVENT_SUBSCRIPTIONS:
+                        await websocket.send(sub)
+                        await websocket.recv()
+                    delay = self.RECONNECT_DELAY_MIN
+                    # The node may have restarted on a new version after an upgrade,
+                    # query it again on the next new height
+                    self._cached_version = None
+                    while True:
+                        raw = await websocket.recv()
+                        if self.skip_vote_event(raw):
+                            continue
+                        data = orjson.loads(raw)['result']
+                        if 'query' in data:
+                            await self.process_query_response(data)
+            except (websockets.exceptions.WebSocketException,
+                    OSError, asyncio.TimeoutError) as err:
+                logging.exception(
+                    f'subscribe> {type(err).__name__}: {err}', exc_info=False)
+            logging.info(f'Reconnecting to the RPC websocket in {delay}s')
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.RECONNECT_DELAY_MAX)
+
+    async def monitor(self):
         """
-        Sends the message to all connected websocket clients
+        Collect the validators, then follow the consensus events
         """
-        results = await gather_limit(
-            self.MAX_CONCURRENT_SEND_COROS,
-            *[client.send(message)
-              for client in self.client_websockets],
-            return_exceptions=True,
-        )
-        for result in results:
-            if isinstance(result, websockets.exceptions.ConnectionClosedError):
-                logging.exception(
-                    f'monitor> ConnectionClosedError: {result}', exc_info=False)
-            if isinstance(result, websockets.exceptions.ConnectionClosedOK):
-                logging.exception(
-                    f'monitor> ConnectionClosedOK: {result}', exc_info=False)
+        await self.initial_load()
+        self.publish(orjson.dumps({'monikers': self.monikers}), 'monikers')
+        await self.update_state()
+        await asyncio.gather(self.subscribe(), self.flush_votes())
+
+    async def run(self, channel: socket.socket):
+        """
+        Monitor the node and publish every update over the 'channel' socket
+        """
+        reader, self._channel = await asyncio.open_connection(sock=channel)
+        self.publish(orjson.dumps({'data_sources': self.node}), 'data_sources')
+        # The server process never writes to the channel:
+        # the read only completes once the server process has stopped
+        done, pending = await asyncio.wait(
+            [asyncio.create_task(reader.read()),
+             asyncio.create_task(self.monitor())],
+            return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await self.close()
+        for task in done:
+            task.result()
+
+    def publish(self, message: bytes, kind: str):
+        """
+        Queue the message for the server process, replacing any unsent message
+        of the same kind. Messages published in the same event loop iteration
+        are written together by _flush_outbox
+        """
+        if not self._outbox:
+            asyncio.get_running_loop().call_soon(self._flush_outbox)
+        self._outbox.pop(kind, None)
+        self._outbox[kind] = message
+
+    def _flush_outbox(self):
+        """
+        Write the queued messages to the server process, one line each: <kind> <message>
+        orjson escapes newlines, so a message never spans more than one line
+        """
+        self._channel.write(b''.join(kind.encode() + b' ' + message + b'\n'
+                                     for kind, message in self._outbox.items()))
+        self._outbox.clear()
 
 
 class ConsensusMonitorServer:
@@ -424,31 +776,105 @@ class ConsensusMonitorServer:
     - RPC server (including port)
     - Port for incoming websockets connections
     """
+    # Longest update line accepted from the monitor process, in bytes
+    CHANNEL_LIMIT = 2**22
 
     def __init__(self, api_server: str, rpc_server, port: int):
         self.port = port
-        self.monitor = ConsensusMonitor(
-            api_server=api_server, rpc_server=rpc_server)
+        self.node = {'api': api_server,
+                     'rpc': rpc_server}
+        self.client_websockets = {}
+        self.latest_messages = {}
 
     async def start_server(self):
         """
-        Start listening for websockets connections and consensus monitoring
+        Start the consensus monitor process, listen for websockets connections
+        and relay the monitor updates until the monitor process stops
         """
-        async with websockets.serve(self.handler, "", self.port):
-            await self.monitor.subscribe()
-            await asyncio.Future()  # run forever
+        server_end, monitor_end = socket.socketpair()
+        monitor_process = multiprocessing.get_context('spawn').Process(
+            target=run_monitor,
+            args=(self.node['api'], self.node['rpc'], monitor_end),
+            daemon=True)
+        monitor_process.start()
+        monitor_end.close()
+        reader, _ = await asyncio.open_connection(sock=server_end, limit=self.CHANNEL_LIMIT)
+        # Payloads are small and identical for every client:
+        # per-connection deflate would compress the same bytes once per client
+        async with websockets.serve(self.handler, "", self.port, compression=None):
+            while line := await reader.readline():
+                kind, message = line[:-1].split(b' ', 1)
+                self.broadcast(message, kind.decode())
+        logging.error('The monitor process has stopped')
+
+    def broadcast(self, message: bytes, kind: str):
+        """
+        Sends the message to all connected websocket clients
+        The frame is built once and written directly to each idle client's transport,
+        busy clients have the message queued in their sender task
+        """
+        self.latest_messages[kind] = message
+        # Server frames are unmasked and compression is disabled,
+        # so the frame bytes are the same for every client
+        frame = Frame(Opcode.TEXT, message).serialize(mask=False)
+        # Closing connections are dropped now rather than when the handler sees them close
+        for websocket in [ws for ws in self.client_websockets if not ws.open]:
+            self.client_websockets.pop(websocket).close()
+        for websocket, sender in self.client_websockets.items():
+            if sender.idle():
+                websocket.transport.write(frame)
+            else:
+                sender.queue(message, kind)
+
+    async def add_client(self, websocket):
+        """
+        Register websocket client, send the latest message of each kind
+        """
+        sender = ClientSender(websocket)
+        self.client_websockets[websocket] = sender
+        for kind, message in self.latest_messages.items():
+            sender.queue(message, kind)
+
+    async def remove_client(self, websocket):
+        """
+        Unregister websocket client
+        """
+        sender = self.client_websockets.pop(websocket, None)
+        if sender:
+            sender.close()
 
     async def handler(self, websocket):
         """
         Handle incoming and departing websockets connections
         """
-        await self.monitor.add_client(websocket)
+        await self.add_client(websocket)
         logging.info('%s client(s) connected.', len(
-            self.monitor.client_websockets))
+            self.client_websockets))
         await websocket.wait_closed()
-        await self.monitor.remove_client(websocket)
+        await self.remove_client(websocket)
         logging.info('%s client(s) connected.', len(
-            self.monitor.client_websockets))
+            self.client_websockets))
+
+
+def run_event_loop(main):
+    """
+    Run the 'main' coroutine, using the libuv event loop where available
+    """
+    try:
+        import uvloop  # pylint: disable=import-outside-toplevel
+        uvloop.install()
+    except ImportError:
+        logging.info('uvloop not found, using the default event loop')
+    asyncio.run(main)
+
+
+def run_monitor(api_server: str, rpc_server: str, channel: socket.socket):
+    """
+    Entry point of the monitor process
+    """
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    monitor = ConsensusMonitor(api_server=api_server, rpc_server=rpc_server)
+    run_event_loop(monitor.run(channel))
 
 
 if __name__ == "__main__":
@@ -468,11 +894,9 @@ if __name__ == "__main__":
                         default=9001)
     args = vars(parser.parse_args())
     # Configure Logging
-    logging.basicConfig(level=logging.INFO,
-                        format='%(asctime)s %(levelname)s %(message)s')
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
     ms = ConsensusMonitorServer(
         api_server=args['api'],
         rpc_server=args['rpc'],
         port=args['port'])
-
-    asyncio.run(ms.start_server())
+    run_event_loop(ms.start_server())